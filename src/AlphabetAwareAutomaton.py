@@ -1,6 +1,7 @@
-from math import ceil, log2
-from typing import Dict, List, Set
+from typing import Optional, Set
 
+from LevelAutomaton import compute_levels, ilog_ceil
+from PositionIndex import PositionIndex
 from SubsequenceAutomaton import SubsequenceAutomaton
 
 
@@ -29,9 +30,17 @@ class AlphabetAwareLevelAutomaton(SubsequenceAutomaton):
       we include only those that occur before the next higher-level state.
     """
 
-    _levels: List[int]
+    __slots__ = ("_levels",)
 
-    def __init__(self, alphabet: Set[str], string: str) -> None:
+    _levels: bytes
+
+    def __init__(
+        self,
+        alphabet: Set[str],
+        string: str,
+        materializeDense: bool = False,
+        index: Optional[PositionIndex] = None,
+    ) -> None:
         """
         Build the alphabet-aware level automaton for the given string.
 
@@ -41,77 +50,31 @@ class AlphabetAwareLevelAutomaton(SubsequenceAutomaton):
             Alphabet of the original string.
         string : str
             Original string S.
+        materializeDense : bool
+            If True, also resolve all default chains into a dense DFA table
+            that `Compute` then uses: one lookup per character, at the cost
+            of O(n * σ) memory. `GetInfo` still reports the compact automaton.
+        index : Optional[PositionIndex]
+            Shared per-string data (the encoded string) of other automata
+            over the same string.
         """
-        super().__init__()
-
-        self._alphabet = alphabet
-        self._originalString = string
-        n = len(string)
-
-        # Allocate transition table (we will fill it backwards, then reverse).
-        self._transitionTable = []
+        super().__init__(alphabet, string, index)
 
         # Precompute levels for states 0..n.
         self._generateLevels()
 
         σ = len(alphabet)
-        Lmax = ceil(log2(σ)) if σ > 1 else 0
-
-        # nearestLevelPos[L] = smallest state with level L that is > s
-        nearestLevelPos: List[int] = [n + 1] * (Lmax + 1)
-
-        # nearestCharPos[c] = closest occurrence of c as a state in [1..n],
-        # n+1 means "none".
-        nearestCharPos: Dict[str, int] = {c: n + 1 for c in alphabet}
-
-        # Build automaton states backwards: s = n, n-1, ..., 0.
-        for s in range(n, -1, -1):
-            lvl = self._levels[s]
-
-            # Find the next state with a strictly higher level.
-            next_level_state = n + 1
-            for L in range(lvl + 1, Lmax + 1):
-                if nearestLevelPos[L] < next_level_state:
-                    next_level_state = nearestLevelPos[L]
-
-            table: Dict[str, int] = {}
-
-            # Default transition (if a higher-level state exists).
-            if next_level_state <= n:
-                table["def"] = next_level_state
-
-            # Span between this state and the next higher-level state
-            # (n+1 if none exists).
-            span = next_level_state - s
-
-            # ---------------------------------------------------------
-            # REGULAR TRANSITIONS
-            # ---------------------------------------------------------
-            if span >= σ:
-                # Alphabet-aware rule: include transitions for *all* characters
-                # in the alphabet, but only if they occur before next_level_state.
-                for c in alphabet:
-                    pos = nearestCharPos[c]
-                    if 1 <= pos <= n and pos <= next_level_state:
-                        table[c] = pos
-            else:
-                # Only include characters that actually occur before
-                # the next higher-level state.
-                for c, pos in nearestCharPos.items():
-                    if 1 <= pos <= n and pos <= next_level_state:
-                        table[c] = pos
-
-            self._transitionTable.append(table)
-
-            # Update nearest level for this state's level.
-            nearestLevelPos[lvl] = s
-
-            # Update nearest character positions (suffix-based).
-            if s > 0:
-                nearestCharPos[self._originalString[s - 1]] = s
-
-        # Reverse table so indices correspond to states 0..n.
-        self._transitionTable.reverse()
+        Lmax = ilog_ceil(σ, 2)
+
+        # Build the states backwards (n..0). Each state defaults to the next
+        # state of strictly higher level and has explicit transitions for
+        # the characters occurring up to that state. When the span to it is
+        # at least σ, the alphabet-aware rule asks for all characters that
+        # occur there, which is the same set, so one scan covers both cases.
+        self._buildLevelRows(self._levels, Lmax, len(string))
+
+        if materializeDense:
+            self._materializeDense()
 
     # ------------------------------------------------------------------ #
     # Level: min(log2 σ, largest x with i % 2^x == 0)                    #
@@ -123,24 +86,14 @@ class AlphabetAwareLevelAutomaton(SubsequenceAutomaton):
         For i in [1..n]:
             level(i) = min(ceil(log2 σ), largest x such that i % 2^x == 0)
 
-        State 0 is assigned level 0.
+        State 0 is assigned level 0. The levels come from the shared
+        `compute_levels` cache.
         """
         n = len(self._originalString)
         σ = len(self._alphabet)
-        Lmax = ceil(log2(σ)) if σ > 1 else 0
-
-        self._levels = [0] * (n + 1)
-
-        for i in range(1, n + 1):
-            lvl = 0
-            power = 2
+        Lmax = ilog_ceil(σ, 2)
 
-            # largest x with i % 2^x == 0, capped at Lmax
-            while lvl + 1 <= Lmax and i % power == 0:
-                lvl += 1
-                power *= 2
-
-            self._levels[i] = lvl
+        self._levels = compute_levels(n, 2, Lmax)
 
     # ------------------------------------------------------------------ #
     # SAD evaluation: follow default transitions until match             #
@@ -166,27 +119,4 @@ class AlphabetAwareLevelAutomaton(SubsequenceAutomaton):
         bool
             True if accepted, False otherwise.
         """
-        state = 0
-
-        for c in inputStr:
-            # Characters not in the alphabet cannot be subsequences.
-            if c not in self._alphabet:
-                return False
-
-            while True:
-                table = self._transitionTable[state]
-
-                # Try a regular transition match.
-                if c in table:
-                    state = table[c]
-                    break
-
-                # Otherwise, follow default if available.
-                if "def" in table:
-                    state = table["def"]
-                    continue
-
-                # No way forward for this character.
-                return False
-
-        return True
+        return self._computeCached(inputStr)
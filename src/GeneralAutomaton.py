@@ -1,5 +1,8 @@
-from typing import Dict, Set
+from array import array
+from typing import Optional, Set
 
+from kernels import build_dense_rows, compute_positions, compute_positions_many
+from PositionIndex import PositionIndex
 from SubsequenceAutomaton import SubsequenceAutomaton
 
 
@@ -11,7 +14,7 @@ class GeneralAutomaton(SubsequenceAutomaton):
     where each state `s` represents having matched up to position `s` in S.
 
     For each state s (0 ≤ s ≤ n) and each character c in the alphabet:
-        transitionTable[s][c] = smallest t > s such that S[t] == c
+        transitionTable[s, c] = smallest t > s such that S[t] == c
 
     Properties
     ----------
@@ -20,9 +23,34 @@ class GeneralAutomaton(SubsequenceAutomaton):
 
     This is the baseline against which the more compact default-transition
     automata are compared.
+
+    The table is kept in the base class's `_denseTable`: flat, row-major,
+    shape (n + 1, |alphabet|). Entry `state * |alphabet| + code` holds the
+    next state index, or -1 if the character does not occur after the state.
+
+    With `compact=True` the table is not stored. Instead each character's
+    occurrences are kept in sorted order, and a transition is found by
+    binary search over them: O(n) memory, O(log n) per character.
+
+    Attributes
+    ----------
+    _posPtr, _positions : Optional[array]
+        Compact form only: the position lists of `_index` (see
+        `PositionIndex`).
     """
 
-    def __init__(self, alphabet: Set[str], string: str) -> None:
+    __slots__ = ("_posPtr", "_positions")
+
+    _posPtr: Optional[array]
+    _positions: Optional[array]
+
+    def __init__(
+        self,
+        alphabet: Set[str],
+        string: str,
+        compact: bool = False,
+        index: Optional[PositionIndex] = None,
+    ) -> None:
         """
         Construct the standard subsequence automaton for the given string.
 
@@ -32,32 +60,48 @@ class GeneralAutomaton(SubsequenceAutomaton):
             Set of characters in the string (or superset).
         string : str
             The original string S used to build the automaton.
+        compact : bool
+            If True, store per-character position lists instead of the
+            O(n * |alphabet|) table. `GetInfo` still describes the full
+            automaton.
+        index : Optional[PositionIndex]
+            Shared per-string data (encoded string, position lists) of
+            other automata over the same string.
         """
-        super().__init__()
+        super().__init__(alphabet, string, index)
 
-        self._alphabet = alphabet
-        self._originalString = string
         n = len(string)
 
-        # Transition table for states 0..n
+        # Transition table for states 0..n, every entry starting as -1.
         # State numbers: 0..n; position in string: 1..n
-        self._transitionTable = [{} for _ in range(n + 1)]
-
-        # Nearest occurrence for each character when scanning backwards.
-        # nearest[c] = lowest state index > current corresponding to next c.
-        nearest: Dict[str, int | None] = {c: None for c in alphabet}
-
-        # Build next-occurrence transitions backwards.
-        # When we are at string index i (0-based), the "next occurrence"
-        # is at state i+1 (since state indices correspond to prefix lengths).
-        for i in range(n - 1, -1, -1):
-            nearest[string[i]] = i + 1
-            # At state i, we capture the snapshot of nearest for all characters.
-            for c, pos in nearest.items():
-                if pos is not None:
-                    self._transitionTable[i][c] = pos
-
-        # State n is a sink state: it has an empty transition dict.
+        width = len(alphabet)
+
+        self._posPtr = None
+        self._positions = None
+        if compact:
+            self._posPtr, self._positions = self._index.GetPositions(self._encode)
+
+            # Row i holds one transition per distinct character in S[i:], so
+            # a character last occurring at state t has one in rows 0..t-1.
+            edgeCount = 0
+            for code in range(width):
+                if self._posPtr[code] < self._posPtr[code + 1]:
+                    edgeCount += self._positions[self._posPtr[code + 1] - 1]
+        else:
+            # Build next-occurrence transitions backwards: when we are at
+            # string index i (0-based), the "next occurrence" is at state
+            # i+1 (since state indices correspond to prefix lengths).
+            table = array("i", [-1]) * ((n + 1) * width)
+            edgeCount = build_dense_rows(
+                self._index.GetCodes(self._encode), width, table
+            )
+
+            # State n is a sink state: its row has no transitions.
+            self._setDenseTable(table)
+
+        self._vertexCount = n + 1
+        self._edgeCount = edgeCount
+        self._defaultCount = 0
 
     # ------------------------------------------------------------------ #
     # Matching (straight DFA run)                                       #
@@ -77,18 +121,27 @@ class GeneralAutomaton(SubsequenceAutomaton):
             True if `inputStr` is a subsequence of the original string S,
             False otherwise.
         """
-        state = 0  # start at prefix length 0
+        return self._computeCached(inputStr)
 
-        for c in inputStr:
-            # If the symbol is not in the known alphabet, reject immediately.
-            if c not in self._alphabet:
-                return False
+    def _runCodes(self, codes: bytes | array) -> bool:
+        """
+        Run encoded input through the position lists or, without them,
+        the table.
+        """
+        if self._positions is not None:
+            return compute_positions(self._posPtr, self._positions, codes)
 
-            # If there is no outgoing transition for c, subsequence fails.
-            if c not in self._transitionTable[state]:
-                return False
+        return super()._runCodes(codes)
 
-            # Move to next state.
-            state = self._transitionTable[state][c]
+    def _computeBatch(
+        self, codes: bytes | array, offsets: array, out: bytearray
+    ) -> None:
+        """
+        Run each encoded string of a batch (see `ComputeMany`) through the
+        position lists or, without them, the table.
+        """
+        if self._positions is not None:
+            compute_positions_many(self._posPtr, self._positions, codes, offsets, out)
+            return
 
-        return True
+        super()._computeBatch(codes, offsets, out)
@@ -1,9 +1,78 @@
-from math import ceil, log
-from typing import Dict, List, Set
+from functools import lru_cache
+from typing import Optional, Set
 
+from PositionIndex import PositionIndex
 from SubsequenceAutomaton import SubsequenceAutomaton
 
 
+def ilog_ceil(x: int, k: int) -> int:
+    """
+    Smallest r >= 0 with k^r >= x, i.e. ceil(log_k(x)) for x >= 1.
+
+    Integer-only, so exact powers of k (such as x = 125, k = 5, where
+    `ceil(log(x, k))` yields 4) are not rounded up.
+
+    Parameters
+    ----------
+    x : int
+        Argument (an alphabet size).
+    k : int
+        Base, at least 2.
+
+    Returns
+    -------
+    int
+        The rounded-up logarithm; 0 for x <= 1.
+    """
+    power = 1
+    r = 0
+    while power < x:
+        power *= k
+        r += 1
+    return r
+
+
+@lru_cache(maxsize=32)
+def compute_levels(n: int, k: int, Lmax: int) -> bytes:
+    """
+    Level of every state index 0..n for base k, capped at Lmax.
+
+    For each i (1 ≤ i ≤ n), the level is the largest x ≤ Lmax such that
+    i % (k^x) == 0; state 0 has level 0. The result depends only on
+    (n, k, Lmax), not on the string, so it is cached and shared between
+    automata built over strings of equal length; the result is immutable,
+    so no automaton can change the levels of another.
+
+    Parameters
+    ----------
+    n : int
+        Length of the original string.
+    k : int
+        Level base.
+    Lmax : int
+        Highest level.
+
+    Returns
+    -------
+    bytes
+        The n + 1 levels, one byte each (levels never exceed log2 of the
+        alphabet size).
+    """
+    levels = bytearray(n + 1)
+
+    # Every multiple of k^x has level at least x. Overwriting the
+    # multiples of k, k^2, ..., k^Lmax in turn (one slice assignment
+    # each) leaves every index with the largest such x.
+    power = k
+    for lvl in range(1, Lmax + 1):
+        if power > n:
+            break
+        levels[power::power] = bytes((lvl,)) * (n // power)
+        power *= k
+
+    return bytes(levels)
+
+
 class LevelAutomaton(SubsequenceAutomaton):
     """
     Generalized level automaton with parameter k.
@@ -30,14 +99,23 @@ class LevelAutomaton(SubsequenceAutomaton):
     ----------
     _k : int
         Level base parameter.
-    _levels : List[int]
-        Level for each state index 0..n.
+    _levels : bytes
+        Level for each state index 0..n (shared through the cache).
     """
 
-    _k: int
-    _levels: List[int]
+    __slots__ = ("_k", "_levels")
 
-    def __init__(self, alphabet: Set[str], string: str, k: int) -> None:
+    _k: int
+    _levels: bytes
+
+    def __init__(
+        self,
+        alphabet: Set[str],
+        string: str,
+        k: int,
+        materializeDense: bool = False,
+        index: Optional[PositionIndex] = None,
+    ) -> None:
         """
         Build a level automaton for the given string and parameter k.
 
@@ -49,66 +127,34 @@ class LevelAutomaton(SubsequenceAutomaton):
             Original string S.
         k : int
             Parameter defining the level function (base of exponent).
+        materializeDense : bool
+            If True, also resolve all default chains into a dense DFA table
+            that `Compute` then uses: one lookup per character, at the cost
+            of O(n * σ) memory. `GetInfo` still reports the compact automaton.
+        index : Optional[PositionIndex]
+            Shared per-string data (the encoded string) of other automata
+            over the same string.
         """
-        super().__init__()
+        super().__init__(alphabet, string, index)
 
-        self._alphabet = alphabet
-        self._originalString = string
         self._k = k
-        self._levels = []
-        self._transitionTable = []
 
         # Precompute levels for all positions 0..n (depends on |alphabet| and k).
         self._generateLevels()
 
-        n = len(self._originalString)
-
         # Maximum level Lmax = ceil(log_{k}(|alphabet|)).
         # This matches the generalized alphabet-aware construction.
-        Lmax = ceil(log(len(alphabet), k))
-
-        # nearestLevelPos[L] = smallest state index with level L that is > i
-        # (filled in backwards).
-        nearestLevelPos: List[int] = [n + 1] * (Lmax + 1)
-
-        # nearestCharPos[c] = nearest occurrence of character c as a state index
-        # (1..n, n+1 means "none seen yet").
-        nearestCharPos: Dict[str, int] = {c: n + 1 for c in alphabet}
-
-        # Build transition table backwards for states n..0.
-        for i in range(n, -1, -1):
-            lvl = self._levels[i]
-
-            # Find next state with strictly higher level.
-            next_level_state = n + 1
-            for L in range(lvl + 1, Lmax + 1):
-                if nearestLevelPos[L] < next_level_state:
-                    next_level_state = nearestLevelPos[L]
-
-            table: Dict[str, int] = {}
-
-            # Default transition to the next higher-level state (if any).
-            if next_level_state <= n:
-                table["def"] = next_level_state
-
-            # Regular transitions: only to positions <= next_level_state.
-            # NOTE: The original implementation excludes transitions to state n
-            # because of the `pos < n` condition. This behaviour is kept intact.
-            for c, pos in nearestCharPos.items():
-                if pos <= next_level_state and pos < n:
-                    table[c] = pos
-
-            self._transitionTable.append(table)
+        Lmax = ilog_ceil(len(alphabet), k)
 
-            # Update level-tracking.
-            nearestLevelPos[lvl] = i
+        # Build the states backwards (n..0): defaults to the next state of
+        # strictly higher level, explicit transitions only to positions
+        # <= that state.
+        # NOTE: The original implementation excludes transitions to state n
+        # because of the `pos < n` condition. This behaviour is kept intact.
+        self._buildLevelRows(self._levels, Lmax, len(string) - 1)
 
-            # Update nearest occurrence of character at position i.
-            if i > 0:
-                nearestCharPos[self._originalString[i - 1]] = i
-
-        # Reverse list so that index corresponds to state (0..n).
-        self._transitionTable.reverse()
+        if materializeDense:
+            self._materializeDense()
 
     # ------------------------------------------------------------------ #
     # Level generation per Section 3.3                                   #
@@ -121,23 +167,13 @@ class LevelAutomaton(SubsequenceAutomaton):
             level(i) = largest x such that i % (k^x) == 0,
             but at most ceil(log_k(|alphabet|)).
 
-        State 0 is assigned level 0 by construction.
+        State 0 is assigned level 0 by construction. The levels come from
+        the shared `compute_levels` cache.
         """
         n = len(self._originalString)
-        Lmax = ceil(log(len(self._alphabet), self._k))
-
-        self._levels = [0] * (n + 1)
-
-        for i in range(1, n + 1):
-            lvl = 0
-            power = self._k
+        Lmax = ilog_ceil(len(self._alphabet), self._k)
 
-            # largest x with i % (k^x) == 0, bounded by Lmax
-            while lvl + 1 <= Lmax and i % power == 0:
-                lvl += 1
-                power *= self._k
-
-            self._levels[i] = lvl
+        self._levels = compute_levels(n, self._k, Lmax)
 
     # ------------------------------------------------------------------ #
     # SAD evaluation: follow defaults until we can match a character     #
@@ -163,27 +199,4 @@ class LevelAutomaton(SubsequenceAutomaton):
         bool
             True if accepted, False otherwise.
         """
-        activeState = 0
-
-        for char in inputStr:
-            # If char is outside the alphabet, it cannot be a subsequence.
-            if char not in self._alphabet:
-                return False
-
-            while True:
-                table = self._transitionTable[activeState]
-
-                # Regular transition found.
-                if char in table:
-                    activeState = table[char]
-                    break
-
-                # Try following a default transition.
-                if "def" in table:
-                    activeState = table["def"]
-                    continue
-
-                # No regular, no default → no possible match.
-                return False
-
-        return True
+        return self._computeCached(inputStr)
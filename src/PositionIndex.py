@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from array import array
+from typing import Callable, Optional, Set, Tuple
+
+
+class PositionIndex:
+    """
+    Per-string data shared by all automata built over the same string.
+
+    Several automata over one string (as in `main.py`) would otherwise each
+    encode the string and, for the compact `GeneralAutomaton`, each group
+    its positions by character. Passing one `PositionIndex` as the `index`
+    argument of their constructors computes these once: every entry is
+    filled in by the first automaton that needs it and reused afterwards.
+
+    Character codes depend only on the alphabet (see
+    `SubsequenceAutomaton._charIndex`), so they are the same for every
+    automaton the index can be shared with.
+
+    Attributes
+    ----------
+    _alphabet : Set[str]
+        Alphabet of the string.
+    _string : str
+        The string S.
+    _codes : Optional[bytes | array]
+        S encoded as character codes, None until first requested.
+    _posPtr : Optional[array]
+        Positions of character code c are entries `_posPtr[c]` ..
+        `_posPtr[c + 1] - 1` of `_positions`; None until first requested.
+    _positions : Optional[array]
+        Occurrence positions as state indices (1..n), grouped by character
+        code and ascending within a group.
+    """
+
+    __slots__ = ("_alphabet", "_string", "_codes", "_posPtr", "_positions")
+
+    _alphabet: Set[str]
+    _string: str
+    _codes: Optional[bytes | array]
+    _posPtr: Optional[array]
+    _positions: Optional[array]
+
+    def __init__(self, alphabet: Set[str], string: str) -> None:
+        """
+        Create an empty index for the given string.
+
+        Parameters
+        ----------
+        alphabet : Set[str]
+            Alphabet of the string.
+        string : str
+            The string S.
+        """
+        self._alphabet = alphabet
+        self._string = string
+        self._codes = None
+        self._posPtr = None
+        self._positions = None
+
+    def Matches(self, alphabet: Set[str], string: str) -> bool:
+        """
+        Check whether this index describes the given alphabet and string.
+
+        Parameters
+        ----------
+        alphabet : Set[str]
+            Alphabet of an automaton about to use the index.
+        string : str
+            String of that automaton.
+
+        Returns
+        -------
+        bool
+            True if the index can be shared with that automaton.
+        """
+        sameString = string is self._string or string == self._string
+        return sameString and alphabet == self._alphabet
+
+    def GetCodes(
+        self, encode: Callable[[str], Optional[bytes | array]]
+    ) -> bytes | array:
+        """
+        The string as character codes, encoded on first use.
+
+        Parameters
+        ----------
+        encode : Callable[[str], Optional[bytes | array]]
+            Encoder of the requesting automaton (its `_encode`).
+
+        Returns
+        -------
+        bytes | array
+            Code of every character of S.
+
+        Raises
+        ------
+        ValueError
+            If the alphabet misses a character of S.
+        """
+        codes = self._codes
+        if codes is None:
+            codes = encode(self._string)
+            if codes is None:
+                raise ValueError("alphabet does not cover the string")
+            self._codes = codes
+        return codes
+
+    def GetPositions(
+        self, encode: Callable[[str], Optional[bytes | array]]
+    ) -> Tuple[array, array]:
+        """
+        Positions of S grouped by character code, built on first use with
+        a counting sort.
+
+        Parameters
+        ----------
+        encode : Callable[[str], Optional[bytes | array]]
+            Encoder of the requesting automaton (its `_encode`).
+
+        Returns
+        -------
+        Tuple[array, array]
+            `(_posPtr, _positions)`.
+        """
+        if self._posPtr is None or self._positions is None:
+            codes = self.GetCodes(encode)
+            σ = len(self._alphabet)
+
+            posPtr = array("i", [0]) * (σ + 1)
+            for c in codes:
+                posPtr[c + 1] += 1
+            for c in range(σ):
+                posPtr[c + 1] += posPtr[c]
+
+            positions = array("i", [0]) * len(codes)
+            fill = posPtr[:-1]
+            for i, c in enumerate(codes):
+                positions[fill[c]] = i + 1
+                fill[c] += 1
+
+            self._posPtr = posPtr
+            self._positions = positions
+
+        return self._posPtr, self._positions
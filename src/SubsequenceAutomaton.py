@@ -1,9 +1,41 @@
 from __future__ import annotations
 
+import sys
 from abc import ABC, abstractmethod
-from typing import Dict, List, Set
+from array import array
+from typing import Callable, Dict, List, Optional, Set
 
 from AutomatonData import AutomatonData
+from kernels import (
+    HAVE_NUMBA,
+    build_level_rows,
+    compute_dfa,
+    compute_dfa_many,
+    compute_sad,
+    compute_sad_many,
+    count_level_rows,
+    specialize_dfa,
+)
+from PositionIndex import PositionIndex
+
+# Number of `Compute` results remembered per automaton.
+COMPUTE_CACHE_SIZE = 1024
+
+# Codec that writes code points as native-endian 32-bit integers, matching
+# the item layout of array("i").
+_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+
+
+class _CodeTable(dict):
+    """
+    `str.translate` table from character ordinals to character codes.
+
+    Characters outside the alphabet are deleted (mapped to None), so a
+    translated string shorter than its input contained such a character.
+    """
+
+    def __missing__(self, key: int) -> None:
+        return None
 
 
 class SubsequenceAutomaton(ABC):
@@ -19,15 +51,340 @@ class SubsequenceAutomaton(ABC):
         Set of characters used in the original string.
     _originalString : str
         The original string from which the subsequence automaton is built.
-    _transitionTable : List[Dict[str, int]]
-        Transition table for states 0..n, where each dictionary maps:
-            - character -> next state index
-            - optionally "def" -> default-transition state index
+    _index : PositionIndex
+        Data derived from the string, possibly shared with other automata
+        built over it (its encoded form, position lists).
+    _charIndex : Dict[str, int]
+        Integer code (column) of each alphabet character; characters are
+        numbered 0..|alphabet|-1 in sorted order.
+    _byteCodes : Optional[bytes]
+        `bytes.translate` table mapping a Latin-1 byte to its character code
+        (255 if the byte is not in the alphabet). None when the alphabet
+        does not fit that scheme (non-Latin-1 characters or more than 255
+        of them); inputs are then encoded through `_codeTable`.
+    _codeTable : Optional[_CodeTable]
+        `str.translate` table from character ordinals to codes, used when
+        `_byteCodes` is None (and None otherwise).
+
+    Automata with default transitions store their states in compressed
+    sparse row (CSR) form:
+
+    _rowPtr : array
+        Row offsets, length n + 2. The explicit transitions of state s are
+        entries `_rowPtr[s]` .. `_rowPtr[s + 1] - 1` of the two arrays below.
+    _colIdx : array
+        Character code of each explicit transition, ascending within a row.
+    _targets : array
+        Target state of each explicit transition.
+    _defaults : array
+        Default-transition target of each state, or -1 if it has none.
+    _smallKeys : array
+        Per state, the character codes of a row with at most four
+        transitions packed one per byte (low byte first, 0xff padding), so
+        that the run finds its column with a few word operations.
+    _smallRow : int
+        Largest row length looked up through `_smallKeys` (4), or -1 when
+        rows are always binary searched (`_smallKeys` is then empty).
+    _denseTable : Optional[array]
+        Dense row-major (n + 1) x |alphabet| table, -1 marking a missing
+        transition: the transition table of an automaton without default
+        transitions, or the optional resolved form of one with them (see
+        `_materializeDense`). When set, runs use it instead of the CSR rows.
+    _denseRun : Optional[Callable[[bytes | array], bool]]
+        Run generated for a dense table of a small alphabet (see
+        `kernels.specialize_dfa`), or None.
+
+    Every constructor also records the automaton's size while building it:
+
+    _vertexCount : int
+        Number of states.
+    _edgeCount : int
+        Number of transitions (explicit and default).
+    _defaultCount : int
+        Number of default transitions.
+
+    _computeCache : Dict[str, bool]
+        Results of recent `Compute` calls (at most `COMPUTE_CACHE_SIZE`);
+        automata never change after construction, so entries stay valid.
+    _info : Optional[AutomatonData]
+        Statistics returned by `GetInfo`, None until first requested.
     """
 
+    __slots__ = (
+        "_alphabet",
+        "_originalString",
+        "_index",
+        "_charIndex",
+        "_byteCodes",
+        "_codeTable",
+        "_rowPtr",
+        "_colIdx",
+        "_targets",
+        "_defaults",
+        "_smallKeys",
+        "_smallRow",
+        "_denseTable",
+        "_denseRun",
+        "_vertexCount",
+        "_edgeCount",
+        "_defaultCount",
+        "_computeCache",
+        "_info",
+    )
+
     _alphabet: Set[str]
     _originalString: str
-    _transitionTable: List[Dict[str, int]]
+    _index: PositionIndex
+    _charIndex: Dict[str, int]
+    _byteCodes: Optional[bytes]
+    _codeTable: Optional[_CodeTable]
+    _rowPtr: array
+    _colIdx: array
+    _targets: array
+    _defaults: array
+    _smallKeys: array
+    _smallRow: int
+    _denseTable: Optional[array]
+    _denseRun: Optional[Callable[[bytes | array], bool]]
+    _vertexCount: int
+    _edgeCount: int
+    _defaultCount: int
+    _computeCache: Dict[str, bool]
+    _info: Optional[AutomatonData]
+
+    def __init__(
+        self, alphabet: Set[str], string: str, index: Optional[PositionIndex] = None
+    ) -> None:
+        """
+        Store the alphabet and string, and number the alphabet once for
+        all subclasses: `_charIndex` always, plus `_byteCodes` or
+        `_codeTable` for encoding inputs.
+
+        Parameters
+        ----------
+        alphabet : Set[str]
+            Alphabet of the original string.
+        string : str
+            Original string S.
+        index : Optional[PositionIndex]
+            Index to share with other automata over the same string; a
+            private one is created if None.
+
+        Raises
+        ------
+        ValueError
+            If `alphabet` misses a character of `string`, or `index` was
+            created for a different alphabet or string.
+        """
+        if not alphabet.issuperset(string):
+            raise ValueError("alphabet does not cover the string")
+
+        if index is None:
+            index = PositionIndex(alphabet, string)
+        elif not index.Matches(alphabet, string):
+            raise ValueError("index was built for a different alphabet or string")
+
+        self._alphabet = alphabet
+        self._originalString = string
+        self._index = index
+        self._charIndex = {c: i for i, c in enumerate(sorted(alphabet))}
+        self._denseTable = None
+        self._denseRun = None
+        self._computeCache = {}
+        self._info = None
+
+        self._byteCodes = None
+        if len(alphabet) < 255 and all(ord(c) < 256 for c in alphabet):
+            byteCodes = bytearray(b"\xff" * 256)
+            for c, code in self._charIndex.items():
+                byteCodes[ord(c)] = code
+            self._byteCodes = bytes(byteCodes)
+
+        self._codeTable = None
+        if self._byteCodes is None:
+            self._codeTable = _CodeTable(
+                (ord(c), code) for c, code in self._charIndex.items()
+            )
+
+    # --------------------------------------------------------------------- #
+    # Table layout helpers                                                  #
+    # --------------------------------------------------------------------- #
+    def _buildLevelRows(self, levels: bytes, Lmax: int, maxTarget: int) -> None:
+        """
+        Build the CSR rows and defaults of a level automaton (see
+        `kernels.count_level_rows` and `kernels.build_level_rows`) and
+        record its size.
+
+        Parameters
+        ----------
+        levels : bytes
+            Level of every state 0..n.
+        Lmax : int
+            Highest level.
+        maxTarget : int
+            Largest allowed explicit-transition target.
+        """
+        n = len(self._originalString)
+        σ = len(self._charIndex)
+
+        codes = self._index.GetCodes(self._encode)
+
+        # A counting pass first, so the buffers get their exact size rather
+        # than room for a transition on every character from every state.
+        explicitCount = count_level_rows(codes, levels, Lmax, σ, maxTarget)
+        colIdx = array("i", [0]) * explicitCount
+        targets = array("i", [0]) * explicitCount
+        self._rowPtr = array("i", [0]) * (n + 2)
+        self._defaults = array("i", [0]) * (n + 1)
+
+        defaultCount = build_level_rows(
+            codes,
+            levels,
+            Lmax,
+            σ,
+            maxTarget,
+            self._rowPtr,
+            colIdx,
+            targets,
+            self._defaults,
+        )
+
+        self._colIdx = colIdx
+        self._targets = targets
+        self._packSmallRows()
+
+        self._vertexCount = n + 1
+        self._defaultCount = defaultCount
+        self._edgeCount = len(colIdx) + defaultCount
+
+    def _packSmallRows(self) -> None:
+        """
+        Pack the character codes of every row with at most four explicit
+        transitions into one 32-bit key word (see `kernels.find_small`).
+
+        Most states of the level automata carry only a handful of explicit
+        transitions, so the compiled run mostly reads a single word per
+        state instead of bisecting `_colIdx`. Targets stay in `_targets`:
+        the matching byte's index is the offset from `_rowPtr[s]`.
+
+        Only done under Numba; as plain Python the word arithmetic is slower
+        than `bisect`, so rows are then always binary searched.
+        """
+        self._smallKeys = array("I")
+        self._smallRow = -1
+        if not HAVE_NUMBA or len(self._charIndex) >= 255:
+            return
+
+        rowPtr = self._rowPtr
+
+        # All codes as bytes, padded so that every row can read four bytes;
+        # bytes past a row's end (the next row's codes) are masked to 0xff.
+        codeBytes = bytes(self._colIdx.tolist()) + b"\xff\xff\xff\xff"
+        fill = [(0xFFFFFFFF << (8 * width)) & 0xFFFFFFFF for width in range(5)]
+
+        self._smallKeys = array(
+            "I",
+            [
+                (
+                    int.from_bytes(codeBytes[lo : lo + 4], "little") | fill[hi - lo]
+                    if hi - lo <= 4
+                    else 0xFFFFFFFF
+                )
+                for lo, hi in zip(rowPtr, rowPtr[1:])
+            ],
+        )
+        self._smallRow = 4
+
+    def _materializeDense(self) -> None:
+        """
+        Resolve default-transition chains into a dense DFA table.
+
+        Entry `s * |alphabet| + c` becomes the explicit transition on c
+        found first when following defaults from s, or -1 if there is none
+        on the chain. Running this table as a plain DFA accepts exactly the
+        same strings as the SAD run, with a single lookup per character.
+
+        Defaults always point to a later state, so rows are resolved from
+        state n down to 0: each row starts as a copy of its default target's
+        (already resolved) row and is then overwritten by its own explicit
+        transitions. Costs O(n * |alphabet|) memory; the CSR arrays are kept
+        for `GetInfo`.
+        """
+        σ = len(self._charIndex)
+        rowPtr = self._rowPtr
+        colIdx = self._colIdx
+        targets = self._targets
+        defaults = self._defaults
+
+        dense = array("i", [-1]) * (len(defaults) * σ)
+
+        for s in range(len(defaults) - 1, -1, -1):
+            row = s * σ
+
+            d = defaults[s]
+            if d >= 0:
+                dense[row : row + σ] = dense[d * σ : d * σ + σ]
+
+            for j in range(rowPtr[s], rowPtr[s + 1]):
+                dense[row + colIdx[j]] = targets[j]
+
+        self._setDenseTable(dense)
+
+    def _setDenseTable(self, table: array) -> None:
+        """
+        Use a dense (n + 1) x |alphabet| table for all runs, together with
+        a run specialized to it for small alphabets (see
+        `kernels.specialize_dfa`).
+
+        Parameters
+        ----------
+        table : array
+            Flat row-major transition table, -1 marking a missing transition.
+        """
+        self._denseTable = table
+        self._denseRun = specialize_dfa(table, len(self._charIndex))
+
+    def _encode(self, inputStr: str) -> Optional[bytes | array]:
+        """
+        Translate a string into character codes (see `_charIndex`).
+
+        The whole string is translated in C-level passes, without creating
+        or hashing a `str` per character: Latin-1 alphabets go through
+        `bytes.translate`, others through `str.translate`.
+
+        Parameters
+        ----------
+        inputStr : str
+            String to translate.
+
+        Returns
+        -------
+        Optional[bytes | array]
+            Code of every character, or None if some character
+            is not in the alphabet (such a string is never a subsequence).
+        """
+        if self._byteCodes is not None:
+            try:
+                data = inputStr.encode("latin-1")
+            except UnicodeEncodeError:
+                # A character above U+00FF cannot be in a Latin-1 alphabet.
+                return None
+
+            byteCodes = data.translate(self._byteCodes)
+            if 255 in byteCodes:
+                return None
+            return byteCodes
+
+        # Otherwise translate every character to the character whose ordinal
+        # is its code, and reinterpret that string's UTF-32 form as array("i").
+        assert self._codeTable is not None
+        translated = inputStr.translate(self._codeTable)
+        if len(translated) != len(inputStr):
+            return None
+
+        codes = array("i")
+        codes.frombytes(translated.encode(_UTF32, "surrogatepass"))
+        return codes
 
     # --------------------------------------------------------------------- #
     # Core interface                                                        #
@@ -50,6 +407,200 @@ class SubsequenceAutomaton(ABC):
         """
         raise NotImplementedError
 
+    def _computeCached(self, inputStr: str) -> bool:
+        """
+        Shared body of the subclasses' `Compute`: encode and run the
+        string, remembering the result.
+
+        Candidates longer than S are rejected before anything else, and
+        repeated ones are answered from `_computeCache`. When the cache is
+        full the oldest entry is dropped.
+
+        Parameters
+        ----------
+        inputStr : str
+            Candidate subsequence.
+
+        Returns
+        -------
+        bool
+            True if accepted, False otherwise.
+        """
+        # Every transition consumes a position of S.
+        if len(inputStr) > len(self._originalString):
+            return False
+
+        cache = self._computeCache
+        accepted = cache.get(inputStr)
+        if accepted is not None:
+            return accepted
+
+        # A character outside the alphabet cannot be in a subsequence; the
+        # encoder detects one in the same C-level pass that translates.
+        codes = self._encode(inputStr)
+        accepted = codes is not None and self._runCodes(codes)
+
+        if len(cache) >= COMPUTE_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[inputStr] = accepted
+
+        return accepted
+
+    def Encode(self, inputStr: str) -> Optional[bytes | array]:
+        """
+        Encode a candidate string once for use with `ComputeEncoded`.
+
+        Codes depend only on the alphabet, so the result can be passed to
+        every automaton built over the same alphabet.
+
+        Parameters
+        ----------
+        inputStr : str
+            Candidate subsequence.
+
+        Returns
+        -------
+        Optional[bytes | array]
+            The encoded candidate, or None if it contains a character
+            outside the alphabet (it is then never accepted).
+        """
+        return self._encode(inputStr)
+
+    def ComputeEncoded(self, codes: Optional[bytes | array]) -> bool:
+        """
+        `Compute` for a candidate already encoded by `Encode`.
+
+        Parameters
+        ----------
+        codes : Optional[bytes | array]
+            Result of `Encode` on an automaton with the same alphabet.
+
+        Returns
+        -------
+        bool
+            True if the encoded candidate is accepted, False otherwise.
+        """
+        if codes is None or len(codes) > len(self._originalString):
+            return False
+
+        return self._runCodes(codes)
+
+    def ComputeMany(self, inputs: List[str]) -> List[bool]:
+        """
+        Check many candidate strings against this automaton in one batch.
+
+        All candidates are encoded and concatenated into one buffer, which
+        is handed to a batched kernel (parallel over candidates when Numba
+        is available) sharing this automaton's transition arrays.
+
+        Parameters
+        ----------
+        inputs : List[str]
+            Candidate subsequences to test.
+
+        Returns
+        -------
+        List[bool]
+            `Compute(s)` for each candidate `s`, in input order.
+        """
+        n = len(self._originalString)
+        parts = []
+        rejected = []
+        offsets = array("i", [0])
+        total = 0
+
+        for i, inputStr in enumerate(inputs):
+            codes = self._encode(inputStr) if len(inputStr) <= n else None
+            if codes is None:
+                rejected.append(i)
+            else:
+                parts.append(codes)
+                total += len(codes)
+            offsets.append(total)
+
+        allCodes: bytes | array
+        if self._byteCodes is not None:
+            allCodes = b"".join(parts)
+        else:
+            allCodes = array("i")
+            for codes in parts:
+                allCodes.extend(codes)
+
+        out = bytearray(len(inputs))
+        self._computeBatch(allCodes, offsets, out)
+
+        # Rejected candidates were given an empty span; fix their result.
+        for i in rejected:
+            out[i] = 0
+
+        return [bool(accepted) for accepted in out]
+
+    def _runCodes(self, codes: bytes | array) -> bool:
+        """
+        Run encoded input through the dense table if there is one,
+        otherwise through the CSR rows, following default transitions.
+
+        Parameters
+        ----------
+        codes : bytes | array
+            Encoded input (see `_encode`).
+
+        Returns
+        -------
+        bool
+            True if accepted, False otherwise.
+        """
+        if self._denseRun is not None:
+            return self._denseRun(codes)
+
+        if self._denseTable is not None:
+            return compute_dfa(self._denseTable, len(self._charIndex), codes)
+
+        return compute_sad(
+            self._rowPtr,
+            self._colIdx,
+            self._targets,
+            self._defaults,
+            self._smallKeys,
+            self._smallRow,
+            codes,
+        )
+
+    def _computeBatch(
+        self, codes: bytes | array, offsets: array, out: bytearray
+    ) -> None:
+        """
+        Run the automaton over each encoded string of a batch.
+
+        Uses the dense table if there is one, otherwise the CSR rows.
+
+        Parameters
+        ----------
+        codes : bytes | array
+            Concatenated encoded candidates.
+        offsets : array
+            Candidate i occupies codes[offsets[i]:offsets[i + 1]].
+        out : bytearray
+            Receives 1 (accepted) or 0 for each candidate.
+        """
+        if self._denseTable is not None:
+            compute_dfa_many(
+                self._denseTable, len(self._charIndex), codes, offsets, out
+            )
+            return
+
+        compute_sad_many(
+            self._rowPtr,
+            self._colIdx,
+            self._targets,
+            self._defaults,
+            self._smallKeys,
+            self._smallRow,
+            codes,
+            offsets,
+            out,
+        )
+
     # --------------------------------------------------------------------- #
     # Size / statistics interface                                           #
     # --------------------------------------------------------------------- #
@@ -57,7 +608,7 @@ class SubsequenceAutomaton(ABC):
         """
         Compute statistics about the internal automaton representation.
 
-        Iterates over all states in `_transitionTable` and counts:
+        Uses the counts recorded during construction (O(1)) and reports:
             - number of states (vertices)
             - number of transitions (edges)
             - how many transitions are default vs explicit
@@ -70,24 +621,16 @@ class SubsequenceAutomaton(ABC):
         Returns
         -------
         AutomatonData
-            A dataclass aggregating all these statistics.
+            A dataclass aggregating all these statistics. It is computed on
+            the first call; later calls return the same object.
         """
-        vertexCount = 0
-        edgeCount = 0
-        defaultCount = 0
-        explicitCount = 0
+        if self._info is not None:
+            return self._info
 
-        for vertex in self._transitionTable:
-            vertexCount += 1
-            edgeCount += len(vertex.keys())
-
-            if "def" in vertex.keys():
-                # One default + remaining explicit transitions
-                defaultCount += 1
-                explicitCount += len(vertex.keys()) - 1
-            else:
-                # Only explicit transitions
-                explicitCount += len(vertex.keys())
+        vertexCount = self._vertexCount
+        edgeCount = self._edgeCount
+        defaultCount = self._defaultCount
+        explicitCount = edgeCount - defaultCount
 
         # Note: no protection against division by zero is added,
         # to preserve the original behaviour exactly.
@@ -95,7 +638,7 @@ class SubsequenceAutomaton(ABC):
         explicitRatio = explicitCount / edgeCount
         savedRatio = 1 - edgeCount / ((vertexCount + 1) * len(self._alphabet))
 
-        return AutomatonData(
+        self._info = AutomatonData(
             vertexCount,
             edgeCount,
             defaultCount,
@@ -104,3 +647,4 @@ class SubsequenceAutomaton(ABC):
             explicitRatio,
             savedRatio,
         )
+        return self._info
@@ -0,0 +1,588 @@
+"""
+Inner loops shared by the subsequence automata.
+
+The functions in this module only work on flat integer arrays
+(`array.array` buffers and plain ints), which makes them suitable for
+Numba's nopython mode. Numba is an optional dependency: when it is not
+installed, `njit` below is a no-op decorator, `prange` is plain `range`,
+and the very same code runs as ordinary Python.
+
+Compiled functions are cached on disk (`cache=True`), so only the first
+run after a change pays the compilation cost. Numba compiles one
+specialization per argument type, so `bytes` input (Latin-1 alphabets)
+and `array("i")` input (other alphabets) are each compiled once. The
+cache lives in `__pycache__` next to this file; if that directory is
+read-only, point `NUMBA_CACHE_DIR` at a writable one. Ahead-of-time
+compilation (`numba.pycc`) is deprecated and not used.
+"""
+
+from bisect import bisect_left
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+    from numba import njit, prange  # type: ignore[import-not-found]
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    prange = range  # type: ignore[misc]
+
+    def njit(*args, **kwargs):  # type: ignore[no-redef]
+        """
+        Stand-in for `numba.njit` when Numba is unavailable.
+
+        Supports both the bare `@njit` and the `@njit(...)` forms and
+        returns the decorated function unchanged.
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+def as_buffer(data):
+    """
+    Prepare an `array.array` / `bytes` / `bytearray` for a parallel kernel.
+
+    Numba cannot lower `prange` loops over `array.array` buffers, so under
+    Numba (which always brings NumPy) this returns a zero-copy NumPy view
+    with the buffer's item type. Without Numba it returns `data` as is.
+    """
+    if HAVE_NUMBA:
+        return np.asarray(memoryview(data))
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Searching
+# ---------------------------------------------------------------------------
+
+if HAVE_NUMBA:
+
+    @njit(cache=True)
+    def lower_bound(values, x, lo, hi):
+        """
+        Index of the first element >= x in the sorted slice values[lo:hi].
+
+        Same contract as `bisect.bisect_left`, which is used instead when
+        the code runs as plain Python (it is implemented in C).
+        """
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if values[mid] < x:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+else:
+    lower_bound = bisect_left  # type: ignore[assignment]
+
+
+# ---------------------------------------------------------------------------
+# Automaton runs
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def run_dfa(table, width, codes, start, stop):
+    """
+    Run a complete DFA (no default transitions) over codes[start:stop].
+
+    Parameters
+    ----------
+    table : array
+        Flat row-major transition table, -1 marking a missing transition.
+    width : int
+        Number of columns per state.
+    codes : array or bytes
+        Encoded input (character codes / column indices).
+    start, stop : int
+        Bounds of the string to run within `codes`.
+
+    Returns
+    -------
+    bool
+        True if every character could be consumed.
+    """
+    state = 0
+
+    for i in range(start, stop):
+        state = table[state * width + codes[i]]
+        if state < 0:
+            return False
+
+    return True
+
+
+@njit(cache=True)
+def find_small(key, c):
+    """
+    Slot of character code c in a packed key word, or -1 (SWAR lookup).
+
+    `key` holds up to four codes, one per byte starting at the low byte,
+    with unused bytes set to 0xff. XOR with c broadcast to all four bytes
+    turns the matching byte into zero; `(x - 0x01..) & ~x & 0x80..` flags
+    zero bytes, the lowest flag always marking a true match. Its byte
+    index is read off with one multiplication instead of a loop.
+    """
+    x = key ^ (c * 0x01010101)
+    m = (x - 0x01010101) & ~x & 0x80808080
+    if m == 0:
+        return -1
+    return ((((m & -m) >> 7) * 0x00010203) >> 24) & 0xFF
+
+
+@njit(cache=True)
+def run_sad(rowPtr, colIdx, targets, defaults, smallKeys, smallRow, codes, start, stop):
+    """
+    Run a subsequence automaton with default transitions (SAD) over
+    codes[start:stop].
+
+    For each character, default transitions are followed until an explicit
+    transition matches. Rows with at most `smallRow` transitions are looked
+    up in their packed key word (see `find_small`); larger rows by binary
+    search over the row's ascending character codes.
+
+    Parameters
+    ----------
+    rowPtr, colIdx, targets : array
+        CSR explicit-transition arrays (see `SubsequenceAutomaton`).
+    defaults : array
+        Default-transition target per state, -1 if none.
+    smallKeys : array
+        Packed character codes of each state's row.
+    smallRow : int
+        Largest row length looked up in `smallKeys`, -1 to never use it.
+    codes : array or bytes
+        Encoded input (character codes).
+    start, stop : int
+        Bounds of the string to run within `codes`.
+
+    Returns
+    -------
+    bool
+        True if every character could be consumed.
+    """
+    state = 0
+
+    for i in range(start, stop):
+        c = codes[i]
+        while True:
+            lo = rowPtr[state]
+            hi = rowPtr[state + 1]
+            if hi - lo <= smallRow:
+                j = find_small(smallKeys[state], c)
+                if j >= 0:
+                    state = targets[lo + j]
+                    break
+            else:
+                j = lower_bound(colIdx, c, lo, hi)
+                if j < hi and colIdx[j] == c:
+                    state = targets[j]
+                    break
+
+            state = defaults[state]
+            if state < 0:
+                return False
+
+    return True
+
+
+@njit(cache=True)
+def compute_dfa(table, width, codes):
+    """Run a complete DFA over a whole encoded string (see `run_dfa`)."""
+    return run_dfa(table, width, codes, 0, len(codes))
+
+
+@njit(cache=True)
+def compute_sad(rowPtr, colIdx, targets, defaults, smallKeys, smallRow, codes):
+    """Run a SAD over a whole encoded string (see `run_sad`)."""
+    return run_sad(
+        rowPtr, colIdx, targets, defaults, smallKeys, smallRow, codes, 0, len(codes)
+    )
+
+
+@njit(cache=True)
+def run_positions(posPtr, positions, codes, start, stop):
+    """
+    Run the subsequence automaton in its position-list form over
+    codes[start:stop].
+
+    The transition from state s on c goes to the first occurrence of c
+    after s, found by binary search in c's sorted positions.
+
+    Parameters
+    ----------
+    posPtr, positions : array
+        Positions of S grouped by character code (see `GeneralAutomaton`).
+    codes : array or bytes
+        Encoded input (character codes).
+    start, stop : int
+        Bounds of the string to run within `codes`.
+
+    Returns
+    -------
+    bool
+        True if every character could be consumed.
+    """
+    state = 0
+
+    for i in range(start, stop):
+        c = codes[i]
+        hi = posPtr[c + 1]
+        j = lower_bound(positions, state + 1, posPtr[c], hi)
+        if j == hi:
+            return False
+        state = positions[j]
+
+    return True
+
+
+@njit(cache=True)
+def compute_positions(posPtr, positions, codes):
+    """Run position lists over a whole encoded string (see `run_positions`)."""
+    return run_positions(posPtr, positions, codes, 0, len(codes))
+
+
+# ---------------------------------------------------------------------------
+# Specialized runs
+# ---------------------------------------------------------------------------
+
+# Widest table for which `specialize_dfa` generates a run.
+SPECIALIZE_MAX_WIDTH = 8
+
+_DFA_TEMPLATE = """
+def run(codes, table=table):
+    state = 0
+    for c in codes:
+        state = table[state * {width} + c]
+        if state < 0:
+            return False
+    return True
+"""
+
+
+def specialize_dfa(table, width):
+    """
+    Generate a plain-Python DFA run bound to one table of a small width.
+
+    The generated function iterates the codes directly, has the width as a
+    constant and the table as a local, which makes it about a third faster
+    than `compute_dfa` as plain Python. Under Numba the compiled
+    `compute_dfa` is faster still, so nothing is generated.
+
+    Parameters
+    ----------
+    table : array
+        Flat row-major transition table (see `run_dfa`).
+    width : int
+        Number of columns per state.
+
+    Returns
+    -------
+    Optional[Callable]
+        `run(codes) -> bool`, equivalent to `compute_dfa(table, width,
+        codes)`, or None when Numba is available or `width` exceeds
+        `SPECIALIZE_MAX_WIDTH`.
+    """
+    if HAVE_NUMBA or width > SPECIALIZE_MAX_WIDTH:
+        return None
+
+    namespace = {"table": table}
+    exec(_DFA_TEMPLATE.format(width=int(width)), namespace)
+    return namespace["run"]
+
+
+# ---------------------------------------------------------------------------
+# Construction
+# ---------------------------------------------------------------------------
+
+
+@njit(cache=True)
+def count_level_rows(codes, levels, Lmax, sigma, maxTarget):
+    """
+    Number of explicit transitions `build_level_rows` will write.
+
+    Runs the same backward scan without storing anything, so the caller
+    can allocate the CSR buffers at their exact size (O(n log σ) for the
+    level automata) instead of the (n + 1) * sigma worst case.
+
+    Parameters
+    ----------
+    codes, levels, Lmax, sigma, maxTarget
+        As for `build_level_rows`.
+
+    Returns
+    -------
+    int
+        Total number of explicit transitions of states 0..n.
+    """
+    n = len(codes)
+
+    # Same bookkeeping as in `build_level_rows`.
+    nearestFromLevel = [n + 1] * (Lmax + 2)
+    nearestCharPos = [n + 1] * sigma
+    count = 0
+
+    for s in range(n, -1, -1):
+        lvl = levels[s]
+        limit = nearestFromLevel[lvl + 1]
+        if maxTarget < limit:
+            limit = maxTarget
+
+        for pos in nearestCharPos:
+            if pos <= limit:
+                count += 1
+
+        for L in range(lvl + 1):
+            nearestFromLevel[L] = s
+
+        if s > 0:
+            nearestCharPos[codes[s - 1]] = s
+
+    return count
+
+
+@njit(cache=True)
+def build_level_rows(
+    codes, levels, Lmax, sigma, maxTarget, rowPtr, colIdx, targets, defaults
+):
+    """
+    Backward construction scan shared by the level automata.
+
+    States are visited from n down to 0. Each state gets a default
+    transition to the nearest later state of strictly higher level (if
+    any), and an explicit transition for every character whose nearest
+    occurrence after the state lies at or before that state and at or
+    below `maxTarget`.
+
+    Parameters
+    ----------
+    codes : array or bytes
+        The original string, encoded (n codes).
+    levels : bytes
+        Level of every state 0..n.
+    Lmax : int
+        Highest level.
+    sigma : int
+        Alphabet size.
+    maxTarget : int
+        Largest allowed explicit-transition target.
+    rowPtr : array
+        Output, n + 2 entries: CSR row offsets into the two buffers below.
+    colIdx, targets : array
+        Output buffers of exactly `count_level_rows(...)` entries. They are
+        filled from their end towards the front, state n first and codes
+        descending, so they end up in CSR order as is.
+    defaults : array
+        Output, n + 1 entries: default target of each state, or -1.
+
+    Returns
+    -------
+    int
+        The number of default transitions.
+    """
+    n = len(codes)
+
+    # nearestFromLevel[L] = smallest state with level >= L after the current
+    # one; the extra entry Lmax + 1 stays n + 1 ("none").
+    nearestFromLevel = [n + 1] * (Lmax + 2)
+
+    # nearestCharPos[code] = nearest occurrence of the character as a state
+    # index (1..n), n + 1 meaning "none seen yet".
+    nearestCharPos = [n + 1] * sigma
+
+    start = len(colIdx)
+    rowPtr[n + 1] = start
+    defaultCount = 0
+
+    for s in range(n, -1, -1):
+        lvl = levels[s]
+        limit = nearestFromLevel[lvl + 1]
+
+        if limit <= n:
+            defaults[s] = limit
+            defaultCount += 1
+        else:
+            defaults[s] = -1
+
+        if maxTarget < limit:
+            limit = maxTarget
+
+        for code in range(sigma - 1, -1, -1):
+            pos = nearestCharPos[code]
+            if pos <= limit:
+                start -= 1
+                colIdx[start] = code
+                targets[start] = pos
+
+        rowPtr[s] = start
+
+        for L in range(lvl + 1):
+            nearestFromLevel[L] = s
+
+        if s > 0:
+            nearestCharPos[codes[s - 1]] = s
+
+    return defaultCount
+
+
+def build_dense_rows(codes, width, table):
+    """Fill a complete DFA table backwards (see `_dense_rows`)."""
+    return _dense_rows(as_buffer(codes), width, as_buffer(table))
+
+
+@njit(cache=True)
+def _dense_rows(codes, width, table):
+    """
+    Backward construction scan of the complete subsequence DFA.
+
+    Row i is a copy of row i + 1 with the entry of the character S[i]
+    set to state i + 1, so every row is filled by one slice copy and one
+    store. The table is taken as a NumPy view under Numba (which cannot
+    slice `array.array` buffers) and as is otherwise (see `as_buffer`).
+
+    Parameters
+    ----------
+    codes : array or bytes
+        The original string, encoded (n codes).
+    width : int
+        Alphabet size.
+    table : array
+        Flat row-major (n + 1) x width table with every entry -1 on
+        entry; row n is left as is.
+
+    Returns
+    -------
+    int
+        Number of transitions, i.e. entries other than -1.
+    """
+    n = len(codes)
+    distinctSeen = 0
+    edgeCount = 0
+
+    for i in range(n - 1, -1, -1):
+        row = i * width
+        table[row : row + width] = table[row + width : row + 2 * width]
+        code = codes[i]
+        if table[row + code] < 0:
+            distinctSeen += 1
+        table[row + code] = i + 1
+        edgeCount += distinctSeen
+
+    return edgeCount
+
+
+# ---------------------------------------------------------------------------
+# Batched runs
+# ---------------------------------------------------------------------------
+
+
+def compute_dfa_many(table, width, codes, offsets, out):
+    """Run a complete DFA over many encoded strings (see `_dfa_many`)."""
+    _dfa_many(
+        as_buffer(table), width, as_buffer(codes), as_buffer(offsets), as_buffer(out)
+    )
+
+
+def compute_sad_many(
+    rowPtr, colIdx, targets, defaults, smallKeys, smallRow, codes, offsets, out
+):
+    """Run a SAD over many encoded strings (see `_sad_many`)."""
+    _sad_many(
+        as_buffer(rowPtr),
+        as_buffer(colIdx),
+        as_buffer(targets),
+        as_buffer(defaults),
+        as_buffer(smallKeys),
+        smallRow,
+        as_buffer(codes),
+        as_buffer(offsets),
+        as_buffer(out),
+    )
+
+
+def compute_positions_many(posPtr, positions, codes, offsets, out):
+    """Run position lists over many encoded strings (see `_positions_many`)."""
+    _positions_many(
+        as_buffer(posPtr),
+        as_buffer(positions),
+        as_buffer(codes),
+        as_buffer(offsets),
+        as_buffer(out),
+    )
+
+
+@njit(cache=True, parallel=True)
+def _dfa_many(table, width, codes, offsets, out):
+    """
+    Run a complete DFA over many encoded strings, in parallel under Numba.
+
+    Parameters
+    ----------
+    table, width :
+        As in `run_dfa`.
+    codes : array or bytes
+        All strings encoded and concatenated.
+    offsets : array
+        String i occupies codes[offsets[i]:offsets[i + 1]].
+    out : bytearray
+        Receives 1 (accepted) or 0 for each string.
+    """
+    count = len(offsets) - 1
+    for i in prange(count):
+        out[i] = run_dfa(table, width, codes, offsets[i], offsets[i + 1])
+
+
+@njit(cache=True, parallel=True)
+def _sad_many(
+    rowPtr, colIdx, targets, defaults, smallKeys, smallRow, codes, offsets, out
+):
+    """
+    Run a SAD over many encoded strings, in parallel under Numba.
+
+    Parameters
+    ----------
+    rowPtr, colIdx, targets, defaults, smallKeys, smallRow :
+        As in `run_sad`.
+    codes : array or bytes
+        All strings encoded and concatenated.
+    offsets : array
+        String i occupies codes[offsets[i]:offsets[i + 1]].
+    out : bytearray
+        Receives 1 (accepted) or 0 for each string.
+    """
+    count = len(offsets) - 1
+    for i in prange(count):
+        out[i] = run_sad(
+            rowPtr,
+            colIdx,
+            targets,
+            defaults,
+            smallKeys,
+            smallRow,
+            codes,
+            offsets[i],
+            offsets[i + 1],
+        )
+
+
+@njit(cache=True, parallel=True)
+def _positions_many(posPtr, positions, codes, offsets, out):
+    """
+    Run position lists over many encoded strings, in parallel under Numba.
+
+    Parameters
+    ----------
+    posPtr, positions :
+        As in `run_positions`.
+    codes : array or bytes
+        All strings encoded and concatenated.
+    offsets : array
+        String i occupies codes[offsets[i]:offsets[i + 1]].
+    out : bytearray
+        Receives 1 (accepted) or 0 for each string.
+    """
+    count = len(offsets) - 1
+    for i in prange(count):
+        out[i] = run_positions(posPtr, positions, codes, offsets[i], offsets[i + 1])
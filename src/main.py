@@ -3,7 +3,8 @@ Main runner for testing subsequence automata on text loaded from a file.
 
 Given a text file as argument:
     - Read the full contents as the base string S
-    - Construct several subsequence automata (general, level-k, alphabet-aware)
+    - Construct the subsequence automata selected with --automata (default:
+      general, level-k, alphabet-aware)
     - Generate a valid and an invalid subsequence
     - Evaluate acceptance of both
     - Print automaton size statistics
@@ -12,13 +13,27 @@ This script does NOT modify the underlying automaton implementation.
 It only adds I/O, sampling utilities, and clean reporting.
 """
 
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
 import random
+import stat
 import sys
-from typing import Set
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress, repeat
+from string import ascii_lowercase
+from typing import Dict, List, Mapping, Optional, Set, Tuple
 
 from AlphabetAwareAutomaton import AlphabetAwareLevelAutomaton
+from AutomatonData import AutomatonData
 from GeneralAutomaton import GeneralAutomaton
 from LevelAutomaton import LevelAutomaton
+from PositionIndex import PositionIndex
 
 # ---------------------------------------------------------------------------
 # File utilities
@@ -29,6 +44,11 @@ def read_text_file(path: str) -> str:
     """
     Read an entire text file as a single string.
 
+    A regular file is memory-mapped and decoded straight from the mapping,
+    so its bytes are copied once (into the decoded string) rather than
+    first into a read buffer; other files (pipes, /dev/stdin) are read
+    normally. Newlines are normalized as in text mode.
+
     Parameters
     ----------
     path : str
@@ -45,24 +65,45 @@ def read_text_file(path: str) -> str:
         If the file is not found.
     """
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
+        with open(path, "rb") as f:
+            info = os.fstat(f.fileno())
+            if not stat.S_ISREG(info.st_mode):
+                # Pipes, /dev/stdin and the like cannot be mapped (and
+                # report no size), so they are read in full.
+                text = f.read().decode("utf-8")
+            elif info.st_size == 0:
+                # An empty file cannot be mapped.
+                text = ""
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        text = str(view, "utf-8")
     except FileNotFoundError:
         print(f"ERROR: File not found: {path}")
         sys.exit(1)
 
+    # Universal newlines, as applied by open(path, "r").
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    return text.strip()
+
 
 # ---------------------------------------------------------------------------
 # Subsequence generation helpers
 # ---------------------------------------------------------------------------
 
+# Random source of the generators below; seeded by main() when --seed is given.
+_rng = random.Random()
+
 
 def generate_valid_subsequence(s: str, length: int = 5) -> str:
     """
     Generate a random *valid* subsequence of the string.
 
-    The function selects indices in sorted order, ensuring that the
-    result is always a subsequence.
+    The function marks randomly chosen indices in a byte mask and keeps
+    the marked characters in their original order, ensuring that the
+    result is always a subsequence (no sort of the indices is needed).
 
     Parameters
     ----------
@@ -79,11 +120,16 @@ def generate_valid_subsequence(s: str, length: int = 5) -> str:
     if not s:
         return ""
 
-    chosen = sorted(random.sample(range(len(s)), min(length, len(s))))
-    return "".join(s[i] for i in chosen)
+    chosen = bytearray(len(s))
+    for i in _rng.sample(range(len(s)), min(length, len(s))):
+        chosen[i] = 1
+
+    return "".join(compress(s, chosen))
 
 
-def generate_invalid_subsequence(s: str, alphabet: Set[str], length: int = 5) -> str:
+def generate_invalid_subsequence(
+    s: str, alphabet: Set[str], counts: Mapping[str, int], length: int = 5
+) -> str:
     """
     Generate a guaranteed *invalid* subsequence.
 
@@ -98,6 +144,8 @@ def generate_invalid_subsequence(s: str, alphabet: Set[str], length: int = 5) ->
         Base string.
     alphabet : Set[str]
         Characters present in the base string.
+    counts : Mapping[str, int]
+        Number of occurrences of each character in the base string.
     length : int
         Desired length of invalid subsequence.
 
@@ -106,15 +154,178 @@ def generate_invalid_subsequence(s: str, alphabet: Set[str], length: int = 5) ->
     str
         An invalid subsequence.
     """
-    available_missing = list(set("abcdefghijklmnopqrstuvwxyz") - alphabet)
+    available_missing = tuple(c for c in ascii_lowercase if c not in alphabet)
 
     if available_missing:
-        # Use letters guaranteed NOT to appear in s
-        return "".join(random.choice(available_missing) for _ in range(length))
+        # Use letters guaranteed NOT to appear in s, drawn in one call
+        return "".join(_rng.choices(available_missing, k=length))
 
     # If alphabet covers all letters: force too many occurrences of a character.
-    c = random.choice(list(alphabet))
-    return c * (s.count(c) + 3)  # impossible count
+    # Sorted, because set order varies between runs and would defeat --seed.
+    c = _rng.choice(sorted(alphabet))
+    return c * (counts[c] + 3)  # impossible count
+
+
+# ---------------------------------------------------------------------------
+# Automaton runs (executed in worker processes)
+# ---------------------------------------------------------------------------
+
+# Automata to report on: short name (as accepted by --automata), display
+# name, class, and constructor arguments following (alphabet, string).
+AUTOMATA: List[Tuple[str, str, type, Tuple]] = [
+    ("gen", "General Automaton (SA)", GeneralAutomaton, ()),
+    ("lev2", "Level Automaton (k=2)", LevelAutomaton, (2,)),
+    ("lev3", "Level Automaton (k=3)", LevelAutomaton, (3,)),
+    ("lev5", "Level Automaton (k=5)", LevelAutomaton, (5,)),
+    ("lev50", "Level Automaton (k=50)", LevelAutomaton, (50,)),
+    ("aware", "Alphabet-Aware Level Automaton", AlphabetAwareLevelAutomaton, ()),
+]
+
+# AUTOMATA by short name.
+REGISTRY: Dict[str, Tuple[str, type, Tuple]] = {
+    key: (name, cls, args) for key, name, cls, args in AUTOMATA
+}
+
+# Base string and derived data of the current worker, set once per
+# process by `init_worker` so the text is not pickled for every task.
+_workerText: str = ""
+_workerAlphabet: Set[str] = set()
+_workerIndex: Optional[PositionIndex] = None
+
+# Encoded candidates of the current worker. All automata share one
+# alphabet and hence one encoding, so each candidate is encoded once.
+_workerCodes: Dict[str, Optional[bytes | array]] = {}
+
+
+def init_worker(text: str, alphabet: Set[str]) -> None:
+    """
+    Process-pool initializer: store the base string for `run_automaton`.
+
+    Parameters
+    ----------
+    text : str
+        Base string.
+    alphabet : Set[str]
+        Characters present in the base string.
+    """
+    global _workerText, _workerAlphabet, _workerIndex
+
+    _workerText = text
+    _workerAlphabet = alphabet
+    _workerIndex = PositionIndex(alphabet, text)
+    _workerCodes.clear()
+
+
+def run_automaton(
+    cls: type, args: Tuple, valid: str, invalid: str
+) -> Tuple[AutomatonData, bool, bool]:
+    """
+    Build one automaton over the worker's base string and test it.
+
+    Automata built in the same worker share its `PositionIndex` and its
+    encoded candidates.
+
+    Parameters
+    ----------
+    cls : type
+        Automaton class.
+    args : Tuple
+        Constructor arguments following (alphabet, string).
+    valid, invalid : str
+        Candidate subsequences.
+
+    Returns
+    -------
+    Tuple[AutomatonData, bool, bool]
+        Size statistics, and whether `valid` and `invalid` were accepted.
+    """
+    aut = cls(_workerAlphabet, _workerText, *args, index=_workerIndex)
+
+    for candidate in (valid, invalid):
+        if candidate not in _workerCodes:
+            _workerCodes[candidate] = aut.Encode(candidate)
+
+    return (
+        aut.GetInfo(),
+        aut.ComputeEncoded(_workerCodes[valid]),
+        aut.ComputeEncoded(_workerCodes[invalid]),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+
+def parse_automata(value: str) -> List[str]:
+    """
+    Parse the comma-separated value of --automata.
+
+    Parameters
+    ----------
+    value : str
+        Short names from `REGISTRY`, e.g. "gen,lev2".
+
+    Returns
+    -------
+    List[str]
+        The names in the order given, without duplicates.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If a name is not in `REGISTRY`.
+    """
+    names = list(dict.fromkeys(n.strip() for n in value.split(",") if n.strip()))
+    unknown = [n for n in names if n not in REGISTRY]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"expected a comma-separated list of {','.join(REGISTRY)}"
+        )
+    return names
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        Arguments without the program name; defaults to `sys.argv[1:]`.
+
+    Returns
+    -------
+    argparse.Namespace
+        `filename`, `automata` (short names), `repeat` and `seed`.
+    """
+    parser = argparse.ArgumentParser(
+        description="Test subsequence automata on text loaded from a file."
+    )
+    parser.add_argument("filename", help="UTF-8 encoded text file")
+    parser.add_argument(
+        "--automata",
+        type=parse_automata,
+        default=list(REGISTRY),
+        help=f"automata to build (default: {','.join(REGISTRY)})",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="build and test the automata N times, reporting the time of each run",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="seed for the generated subsequences (default: unseeded)",
+    )
+
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
 
 
 # ---------------------------------------------------------------------------
@@ -127,54 +338,85 @@ def main() -> None:
     Command-line entry point.
 
     Expects:
-        python main.py <input.txt>
+        python main.py <input.txt> [--automata gen,lev2,...] [--repeat N]
+                               [--seed SEED]
 
-    The file is read, automata are built, and both a valid and invalid
-    subsequence are tested.
+    The file is read, the selected automata are built, and both a valid
+    and invalid subsequence are tested.
     """
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <input.txt>")
-        sys.exit(1)
-
-    filename = sys.argv[1]
-    text = read_text_file(filename)
+    options = parse_args()
+    text = read_text_file(options.filename)
 
     if not text:
         print("ERROR: Input file is empty.")
         sys.exit(1)
 
-    alphabet = set(text)
+    # One pass over the text yields both the alphabet and the counts.
+    counts = Counter(text)
+    alphabet = set(counts)
 
     # Generate testing subsequences
+    if options.seed is not None:
+        _rng.seed(options.seed)
     valid = generate_valid_subsequence(text, max(1, len(text) // 3))
-    invalid = generate_invalid_subsequence(text, alphabet)
-
-    print("===================================================")
-    print("Loaded text statistics")
-    print("---------------------------------------------------")
-    print("Original string length:", len(text))
-    print("Alphabet size:", len(alphabet))
-    print("Valid subsequence   :", valid)
-    print("Invalid subsequence :", invalid)
-    print("===================================================\n")
-
-    # Create automata
-    automata = [
-        ("General Automaton (SA)", GeneralAutomaton(alphabet, text)),
-        ("Level Automaton (k=2)", LevelAutomaton(alphabet, text, 2)),
-        ("Level Automaton (k=3)", LevelAutomaton(alphabet, text, 3)),
-        ("Level Automaton (k=5)", LevelAutomaton(alphabet, text, 5)),
-        ("Level Automaton (k=50)", LevelAutomaton(alphabet, text, 50)),
-        ("Alphabet-Aware Level Automaton", AlphabetAwareLevelAutomaton(alphabet, text)),
+    invalid = generate_invalid_subsequence(text, alphabet, counts)
+
+    # Output is collected in lines and written in one call per block: the
+    # statistics before the automata are built, the report afterwards.
+    separator = "==================================================="
+    lines = [
+        separator,
+        "Loaded text statistics",
+        "---------------------------------------------------",
+        f"Original string length: {len(text)}",
+        f"Alphabet size: {len(alphabet)}",
+        f"Valid subsequence   : {valid}",
+        f"Invalid subsequence : {invalid}",
+        separator,
+        "",
     ]
-
-    # Run each automaton
-    for name, aut in automata:
-        print(name)
-        print(aut.GetInfo())
-        print("Valid subsequence accepted?   ", aut.Compute(valid))
-        print("Invalid subsequence accepted? ", aut.Compute(invalid))
-        print("===================================================\n")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+    selected = [REGISTRY[key] for key in options.automata]
+
+    # Build and test the selected automata in parallel; the results come
+    # back (and are reported) in the order they were selected. Repeated runs
+    # reuse the worker processes and hence the loaded text.
+    lines = []
+    workers = min(len(selected), os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(text, alphabet)
+    ) as executor:
+        for run in range(1, options.repeat + 1):
+            start = time.perf_counter()
+            results = list(
+                executor.map(
+                    run_automaton,
+                    [cls for _, cls, _ in selected],
+                    [args for _, _, args in selected],
+                    repeat(valid),
+                    repeat(invalid),
+                )
+            )
+            if options.repeat > 1:
+                elapsed = time.perf_counter() - start
+                lines.append(f"Run {run}/{options.repeat}: {elapsed:.3f} s")
+
+    if options.repeat > 1:
+        lines += [separator, ""]
+
+    for (name, _, _), (info, validOk, invalidOk) in zip(selected, results):
+        lines += [
+            name,
+            str(info),
+            f"Valid subsequence accepted?    {validOk}",
+            f"Invalid subsequence accepted?  {invalidOk}",
+            separator,
+            "",
+        ]
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":